@@ -1,11 +1,13 @@
 """Dispatches characterization jobs and manages cell data"""
 
+import logging
+import sys
 from multiprocessing import Pool, cpu_count
 from pathlib import Path
 
 from charlib.liberty.UnitsSettings import UnitsSettings
 from charlib.liberty.library import Library
-from charlib.characterizer.TestManager import TestManager, CombinationalTestManager, SequentialTestManager
+from charlib.characterizer.TestManager import CombinationalTestManager, SequentialTestManager
 
 class Characterizer:
     """Main object of Charlib. Keeps track of settings and cells."""
@@ -30,10 +32,13 @@ class Characterizer:
     def characterize(self):
         """Characterize all cells"""
 
+        _configure_logging(self.settings.quiet)
+
         # If no target cells were given, characterize all cells
         if self.settings.use_multithreaded:
-            num_workers = max(len(self.tests), cpu_count())
-            with Pool(num_workers) as pool:
+            # Don't start more workers than there are cells or allowed jobs
+            num_workers = max(1, min(len(self.tests), self.settings.jobs or cpu_count()))
+            with Pool(num_workers, initializer=_configure_logging, initargs=(self.settings.quiet,)) as pool:
                 cells = pool.map(self.characterize_cell, [*self.tests])
         else:
             cells = [self.characterize_cell(cell) for cell in self.tests]
@@ -48,6 +53,16 @@ class Characterizer:
         return cell.characterize(self.settings)
 
 
+def _configure_logging(quiet: bool):
+    """Send charlib progress messages to stdout unless quiet is set.
+
+    Also used as the worker initializer so that messages from workers honor quiet."""
+    logger = logging.getLogger('charlib')
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler(sys.stdout))
+    logger.setLevel(logging.WARNING if quiet else logging.INFO)
+
+
 class CharacterizationSettings:
     """Container for characterization settings"""
     def __init__(self, **kwargs):
@@ -55,6 +70,7 @@ class CharacterizationSettings:
         # Behavioral settings
         self.simulator = kwargs.pop('simulator', 'ngspice-shared')
         self.use_multithreaded = kwargs.pop('multithreaded', True)
+        self.jobs = kwargs.pop('jobs', None)
         self.results_dir = Path(kwargs.pop('results_dir', 'results'))
         self.debug = kwargs.pop('debug', False)
         self.debug_dir = Path(kwargs.pop('debug_dir', 'debug'))
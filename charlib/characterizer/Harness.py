@@ -1,30 +1,48 @@
-from dataclasses import dataclass
-
 import matplotlib.pyplot as plt
 import numpy as np
 from PySpice.Unit import *
 
 from charlib.liberty.cell import Pin
 
-@dataclass
 class PinTestBinding:
     """Associates a pin to test data, such as state"""
-    pin: Pin
-    state: str = '0'
+    __slots__ = ('pin', 'state', 'direction')
 
-    @property
-    def direction(self) -> str:
-        """Return pin state change direction (if applicable)"""
-        if self.state.startswith(('01', 'z1')):
-            return 'rise'
-        elif self.state.startswith(('10', 'z0')):
-            return 'fall'
-        else:
-            return None
+    def __init__(self, pin: Pin, state: str='0') -> None:
+        """Create a new PinTestBinding.
+
+        The state change direction (if applicable) is computed once here. Code that
+        modifies state afterwards must also update direction."""
+        self.pin = pin
+        self.state = state
+        self.direction = _direction(state)
 
     def __str__(self) -> str:
         return f'{self.pin.name}{self.state}'
 
+    def __repr__(self) -> str:
+        return f'PinTestBinding(pin={self.pin!r}, state="{self.state}")'
+
+
+# Maps the first state transition of a pin state string to a direction
+_DIR = {'01': 'rise', 'z1': 'rise', '10': 'fall', 'z0': 'fall'}
+
+def _direction(state: str) -> str:
+    """Return the state change direction for a pin state string"""
+    return _DIR.get(state[:2])
+
+# Timing type edges for each mode, indexed by 0 if the target input rises or 1 if it falls
+_SET_RESET_EDGES = {'recovery': ('rising', 'falling'), 'removal': ('falling', 'rising')}
+_CONSTRAINT_EDGES = {'setup': ('rising', 'falling'), 'hold': ('rising', 'falling')}
+
+
+def _internal_energy_surface(t_start, t_end, q_vdd_dyn, q_vss_dyn, i_vdd_leak, i_vss_leak, v_thresh):
+    """Calculate internal energy for each slew/load pair from 2d arrays of measurements.
+
+    v_thresh may be pre-scaled to convert the result to different energy units."""
+    return (np.minimum(np.abs(q_vdd_dyn), np.abs(q_vss_dyn))
+            - (t_end - t_start) * (np.abs(i_vdd_leak) + np.abs(i_vss_leak)) * 0.5) * v_thresh
+
 
 class Harness:
     """Characterization parameters for one path through a cell.
@@ -32,16 +50,30 @@ class Harness:
     The primary purpose of a harness is to encode mapping of pins to
     states. It also provides some cell-related calculations."""
 
+    __slots__ = ('_target_in_port', '_target_out_port', '_stable_in_ports', '_nontarget_ports',
+                 'results', '_slew_index', '_load_index', '_measurements', '_arc_str', '_short_str')
+
+    # Names of measurements to collect from simulation results
+    MEASUREMENT_NAMES = ('prop_in_out', 'trans_out', 't_energy_start', 't_energy_end',
+                         'q_vdd_dyn', 'q_vss_dyn', 'i_vdd_leak', 'i_vss_leak')
+    # Energy measurements are not yet taken during trials, so they may be absent from results
+    OPTIONAL_MEASUREMENT_NAMES = frozenset({'t_energy_start', 't_energy_end',
+                                            'q_vdd_dyn', 'q_vss_dyn', 'i_vdd_leak', 'i_vss_leak'})
+
     def __init__(self, test_manager, pin_state_map: dict) -> None:
         """Create a new Harness"""
 
         # Parse pin state mapping and set up PinTestBindings
+        self._target_in_port = None
+        self._target_out_port = None
         self._stable_in_ports = []
         self._nontarget_ports = []
+        stable_append = self._stable_in_ports.append
+        nontarget_append = self._nontarget_ports.append
         for pin in test_manager.cell.pins.values():
-            if pin.name in pin_state_map:
+            state = pin_state_map.get(pin.name)
+            if state is not None:
                 # Add to targeted or stable ports
-                state = pin_state_map[pin.name]
                 if state == 'ignore':
                     continue
                 binding = PinTestBinding(pin, state)
@@ -52,17 +84,25 @@ class Harness:
                         self._target_out_port = binding
                 else:
                     if pin.direction == 'input':
-                        self._stable_in_ports.append(binding)
+                        stable_append(binding)
             else:
                 # Add to nontargeted ports
-                self._nontarget_ports.append(PinTestBinding(pin))
+                nontarget_append(PinTestBinding(pin))
+
+        # Initialize results from test input slopes and loads, indexed by (slew, load) position
+        slew_keys = [str(slew) for slew in test_manager.in_slews]
+        load_keys = [str(load) for load in test_manager.out_loads]
+        self.results = [[None] * len(load_keys) for _ in slew_keys]
+
+        # Store measurements as one (slew, load) array per measurement name
+        self._slew_index = {slew: i for i, slew in enumerate(slew_keys)}
+        self._load_index = {load: j for j, load in enumerate(load_keys)}
+        shape = (len(slew_keys), len(load_keys))
+        self._measurements = {name: np.full(shape, np.nan) for name in self.MEASUREMENT_NAMES}
 
-        # Initialize results from test input slopes and loads
-        self.results = {}
-        for slew in test_manager.in_slews:
-            self.results[str(slew)] = {}
-            for load in test_manager.out_loads:
-                self.results[str(slew)][str(load)] = {}
+        # Test ports don't change after setup, so arc strings are only built once
+        self._arc_str = None
+        self._short_str = None
 
     def __str__(self) -> str:
         """Return str(self)"""
@@ -80,17 +120,20 @@ class Harness:
 
     def short_str(self):
         """Create an abbreviated string for the test vector represented by this harness"""
-        harness_str = f'{self.target_in_port.pin.name}={self.target_in_port.state}'
-        for in_port in self.stable_in_ports:
-            harness_str += f' {in_port.pin.name}={in_port.state}'
-        harness_str += f' {self.target_out_port.pin.name}={self.target_out_port.state}'
-        for out_port in self.nontarget_ports:
-            harness_str += f' {out_port.pin.name}={out_port.state}'
-        return harness_str
+        if self._short_str is not None:
+            return self._short_str
+        parts = [f'{self.target_in_port.pin.name}={self.target_in_port.state}']
+        parts.extend(f'{in_port.pin.name}={in_port.state}' for in_port in self.stable_in_ports)
+        parts.append(f'{self.target_out_port.pin.name}={self.target_out_port.state}')
+        parts.extend(f'{out_port.pin.name}={out_port.state}' for out_port in self.nontarget_ports)
+        self._short_str = ' '.join(parts)
+        return self._short_str
 
     def arc_str(self):
         """Return a string representing the test arc"""
-        return f'{self.target_in_port.pin.name} ({self.in_direction}) to {self.target_out_port.pin.name} ({self.out_direction})'
+        if self._arc_str is None:
+            self._arc_str = f'{self.target_in_port.pin.name} ({self.in_direction}) to {self.target_out_port.pin.name} ({self.out_direction})'
+        return self._arc_str
 
     @property
     def target_in_port(self) -> str:
@@ -129,28 +172,68 @@ class Harness:
         stable_dir = '_'.join([str(pin) for pin in self.stable_in_ports])
         return f'{arc_dir}/{stable_dir}'
 
+    def store_result(self, i: int, j: int, result):
+        """Store simulation results for the trial at slew index i and load index j"""
+        self.results[i][j] = result
+
+    def finalize_results(self):
+        """Copy measurements from self.results into the per-measurement arrays.
+
+        Call this once after all trials have been stored. Optional measurements
+        missing from a trial's results are left as NaN; any other missing
+        measurement raises."""
+        for i, slew_results in enumerate(self.results):
+            for j, result in enumerate(slew_results):
+                if result is None:
+                    continue # This trial wasn't run
+                for name, values in self._measurements.items():
+                    if name not in self.OPTIONAL_MEASUREMENT_NAMES:
+                        values[i, j] = float(result[name])
+                        continue
+                    try:
+                        values[i, j] = float(result[name])
+                    except (KeyError, IndexError):
+                        pass # This measurement wasn't taken during the trial
+
+    def measurement(self, name: str) -> np.ndarray:
+        """Return a (slew, load) array of the named measurement in SI units"""
+        return self._measurements[name]
+
     def average_propagation_delay(self):
         """Calculates the average propagation delay over all trials"""
         # TODO: Usually we want longest prop delay instead of average
-        total_delay = 0.0 @ u_s
-        n = 0
-        for slope in self.results.keys():
-            for load in self.results[slope].keys():
-                total_delay += self.results[slope][load]['prop_in_out'] @ u_s
-                n += 1
-        return total_delay / n
+        return float(np.nanmean(self._measurements['prop_in_out'])) @ u_s
 
     def _calc_internal_energy(self, slew: str, load: str, energy_meas_high_threshold_voltage: float):
         """Calculates internal energy for a particular slope/load combination"""
+        # Fetch calculation parameters as raw SI floats
+        i = self._slew_index[str(slew)]
+        j = self._load_index[str(load)]
+        t_start = self._measurements['t_energy_start'][i, j]
+        t_end = self._measurements['t_energy_end'][i, j]
+        q_vdd_dyn = self._measurements['q_vdd_dyn'][i, j]
+        q_vss_dyn = self._measurements['q_vss_dyn'][i, j]
+        i_vdd_leak = self._measurements['i_vdd_leak'][i, j]
+        i_vss_leak = self._measurements['i_vss_leak'][i, j]
+        # Perform the calculation, applying units only to the result
+        time_delta = t_end - t_start
+        avg_current = (abs(i_vdd_leak) + abs(i_vss_leak)) * 0.5
+        internal_charge = float(min(abs(q_vss_dyn), abs(q_vdd_dyn)) - time_delta * avg_current)
+        return (internal_charge * float(energy_meas_high_threshold_voltage)) @ u_J
+
+    def _calc_internal_energy_checked(self, slew: str, load: str, energy_meas_high_threshold_voltage: float):
+        """Calculates internal energy for a particular slope/load combination.
+
+        Slower than _calc_internal_energy, but uses units to validate each step of the
+        calculation. Useful for debugging."""
         # Fetch calculation parameters, using units to validate calculation
-        slew = str(slew)
-        load = str(load)
-        t_start = self.results[slew][load]['t_energy_start'] @ u_s
-        t_end = self.results[slew][load]['t_energy_end'] @ u_s
-        q_vdd_dyn = self.results[slew][load]['q_vdd_dyn'] @ u_C
-        q_vss_dyn = self.results[slew][load]['q_vss_dyn'] @ u_C
-        i_vdd_leak = abs(self.results[slew][load]['i_vdd_leak']) @ u_A
-        i_vss_leak = abs(self.results[slew][load]['i_vss_leak']) @ u_A
+        result = self.results[self._slew_index[str(slew)]][self._load_index[str(load)]]
+        t_start = result['t_energy_start'] @ u_s
+        t_end = result['t_energy_end'] @ u_s
+        q_vdd_dyn = result['q_vdd_dyn'] @ u_C
+        q_vss_dyn = result['q_vss_dyn'] @ u_C
+        i_vdd_leak = abs(result['i_vdd_leak']) @ u_A
+        i_vss_leak = abs(result['i_vss_leak']) @ u_A
         # Perform the calculation
         time_delta = (t_end - t_start)
         avg_current = ((i_vdd_leak + i_vss_leak) / 2)
@@ -161,12 +244,25 @@ class Harness:
 class CombinationalHarness (Harness):
     """A CombinationalHarness captures configuration for testing a CombinationalCell."""
 
+    __slots__ = ('_timing_sense',)
+
     def __init__(self, target_cell, test_vector) -> None:
         """Create a new CombinationalHarness."""
         super().__init__(target_cell, test_vector)
         # Error if we don't have a target input port
         if not self._target_in_port:
             raise ValueError(f'Unable to parse target input port from test vector {test_vector}')
+        self._timing_sense = None
+
+    @property
+    def timing_sense(self) -> str:
+        """Return the timing sense (unateness) of the arc under test"""
+        if self._timing_sense is None:
+            if self.in_direction == self.out_direction:
+                self._timing_sense = 'positive_unate'
+            else:
+                self._timing_sense = 'negative_unate'
+        return self._timing_sense
 
     def plot_energy(self, settings, slews, loads, cell_name):
         """Plot energy vs slew rate vs fanout"""
@@ -177,27 +273,33 @@ class CombinationalHarness (Harness):
         ax = figure.add_subplot(projection='3d')
         ax.set_proj_type('ortho')
 
-        energy_data = []
-        for slew in slews:
-            energy_row = []
-            for load in loads:
-                energy = self._calc_internal_energy(slew, load, settings.energy_meas_high_threshold_voltage())
-                energy_row.append(float(energy.convert(settings.units.energy.prefixed_unit).value))
-            energy_data.append(energy_row)
+        # Calculate internal energy over the whole slew/load surface at once
+        # Fold the J -> energy unit conversion into the threshold voltage scalar
+        v_thresh = float(settings.energy_meas_high_threshold_voltage()) / float(settings.units.energy)
+        m = self._measurements
+        energy_data = _internal_energy_surface(
+            m['t_energy_start'], m['t_energy_end'],
+            m['q_vdd_dyn'], m['q_vss_dyn'],
+            m['i_vdd_leak'], m['i_vss_leak'],
+            v_thresh
+        )
 
         # Expand x and y vectors to 2d arrays
-        x_data = np.repeat(np.expand_dims(slews, 1), len(loads), 1)
-        y_data = np.swapaxes(np.repeat(np.expand_dims(loads, 1), len(slews), 1), 0, 1)
+        x_data, y_data = np.meshgrid(np.asarray(slews), np.asarray(loads), indexing='ij', copy=False)
 
         # Plot energy data
-        ax.plot_surface(x_data, y_data, np.asarray(energy_data), cmap='viridis', label='Energy')
-        ax.set(xlabel=f'Slew Rate [{str(settings.units.time.prefixed_unit)}]',
-               ylabel=f'Fanout [{str(settings.units.capacitance.prefixed_unit)}]',
-               zlabel=f'Energy [{str(settings.units.energy.prefixed_unit)}]',
+        ax.plot_surface(x_data, y_data, energy_data, cmap='viridis', label='Energy')
+        ax.set(xlabel=f'Slew Rate [{settings.units.time.prefixed_unit}]',
+               ylabel=f'Fanout [{settings.units.capacitance.prefixed_unit}]',
+               zlabel=f'Energy [{settings.units.energy.prefixed_unit}]',
                title='Energy vs. Slew Rate vs. Fanout')
 
 
 class SequentialHarness (Harness):
+    __slots__ = ('set', 'reset', 'clock', 'flops', '_flop_names', '_timing_types')
+
+    MEASUREMENT_NAMES = (*Harness.MEASUREMENT_NAMES, 't_setup', 't_hold')
+
     def __init__(self, test_manager, pin_state_map: dict) -> None:
         # Parse internal storage states, clock, set, and reset out of pin mapping
         # Note that set and reset are optional, but must be provided if present
@@ -216,15 +318,17 @@ class SequentialHarness (Harness):
             pin_state_map[test_manager.set.name] = 'ignore'
         # TODO: handle flop internal states
         self.flops = []
+        self._flop_names = frozenset(self.flops)
+        self._timing_types = {} # Cache for _timing_type_with_mode, keyed by mode
         super().__init__(test_manager, pin_state_map)
 
     def short_str(self):
-        harness_str = f'{self.clock.pin.name}={self.clock.state} {super().short_str()}'
+        parts = [f'{self.clock.pin.name}={self.clock.state}', super().short_str()]
         if self.set:
-            harness_str += f' {self.set.pin.name}={self.set.state}'
+            parts.append(f'{self.set.pin.name}={self.set.state}')
         if self.reset:
-            harness_str += f' {self.reset.pin.name}={self.reset.state}'
-        return harness_str
+            parts.append(f'{self.reset.pin.name}={self.reset.state}')
+        return ' '.join(parts)
 
     @property
     def set_direction(self) -> str:
@@ -239,8 +343,12 @@ class SequentialHarness (Harness):
         return self.reset.direction
     
     def invert_set_reset(self):
-        self.set.state = self.set.state[::-1] if self.set.state else None
-        self.reset.state = self.reset.state[::-1] if self.reset.state else None
+        for binding in (self.set, self.reset):
+            if binding is None or not binding.state:
+                continue
+            binding.state = binding.state[::-1]
+            binding.direction = _DIR.get(binding.state[:2])
+        self._timing_types.clear() # Timing types depend on set/reset direction
 
     @property
     def timing_sense_constraint(self) -> str:
@@ -248,33 +356,25 @@ class SequentialHarness (Harness):
         return f'{self.in_direction}_constraint'
 
     def _timing_type_with_mode(self, mode) -> str:
+        """Return the timing type for mode, computing it on first use"""
+        if mode not in self._timing_types:
+            self._timing_types[mode] = self._find_timing_type(mode)
+        return self._timing_types[mode]
+
+    def _find_timing_type(self, mode) -> str:
         # Determine from target input and direction
+        edge = 0 if self.in_direction == 'rise' else 1
         if self.set_direction or self.reset_direction:
             # We're targeting set or reset
-            if mode == 'recovery':
-                if self.in_direction == 'rise':
-                    return f'{mode}_rising'
-                else:
-                    return f'{mode}_falling'
-            elif mode == 'removal':
-                if self.in_direction == 'rise':
-                    return f'{mode}_falling'
-                else:
-                    return f'{mode}_rising'
-            else:
-                return None
-        elif not self.target_in_port.pin.name in [*self.flops]:
+            edges = _SET_RESET_EDGES.get(mode)
+            return f'{mode}_{edges[edge]}' if edges else None
+        elif self.target_in_port.pin.name not in self._flop_names:
             # We're targeting an input port
             if mode == 'clock':
-                if self.clock.state == '0101':
-                    return 'rising_edge'
-                else:
-                    return 'falling_edge'
-            elif mode in ['hold', 'setup']:
-                if self.in_direction == 'rise':
-                    return f'{mode}_rising'
-                else:
-                    return f'{mode}_falling'
+                return 'rising_edge' if self.clock.state == '0101' else 'falling_edge'
+            edges = _CONSTRAINT_EDGES.get(mode)
+            if edges:
+                return f'{mode}_{edges[edge]}'
         # If we get here, most likely the harness isn't configured correctly
         raise ValueError(f'Unable to determine timing type for mode "{mode}"')
 
@@ -309,14 +409,32 @@ class SequentialHarness (Harness):
         pass
 
 # Utilities for working with Harnesses
-def filter_harnesses_by_ports(harness_list: list, in_port, out_port) -> list:
+def build_harness_index(harness_list: list) -> dict:
+    """Index harnesses in harness_list by the pins and output direction they target.
+
+    The returned dict maps (in_pin_name, out_pin_name) and (in_pin_name, out_pin_name,
+    out_direction) to lists of matching harnesses. Pass it as the index argument of
+    filter_harnesses_by_ports or find_harness_by_arc to avoid rescanning harness_list."""
+    index = {}
+    for harness in harness_list:
+        ports = (harness.target_in_port.pin.name, harness.target_out_port.pin.name)
+        index.setdefault(ports, []).append(harness)
+        index.setdefault((*ports, harness.out_direction), []).append(harness)
+    return index
+
+def filter_harnesses_by_ports(harness_list: list, in_port, out_port, index: dict=None) -> list:
     """Finds harnesses in harness_list which target in_port and out_port"""
+    if index is not None:
+        return index.get((in_port.name, out_port.name), [])
     return [harness for harness in harness_list 
             if harness.target_in_port.pin == in_port
             and harness.target_out_port.pin == out_port]
 
-def find_harness_by_arc(harness_list: list, in_port, out_port, out_direction) -> Harness:
-    harnesses = [harness for harness in filter_harnesses_by_ports(harness_list, in_port, out_port) if harness.out_direction == out_direction]
+def find_harness_by_arc(harness_list: list, in_port, out_port, out_direction, index: dict=None) -> Harness:
+    if index is not None:
+        harnesses = index.get((in_port.name, out_port.name, out_direction), [])
+    else:
+        harnesses = [harness for harness in filter_harnesses_by_ports(harness_list, in_port, out_port) if harness.out_direction == out_direction]
     if len(harnesses) > 1:
         raise LookupError('Multiple harnesses present in harness_list with the specified arc!')
     elif len(harnesses) < 1:
@@ -325,7 +443,7 @@ def find_harness_by_arc(harness_list: list, in_port, out_port, out_direction) ->
 
 def check_timing_sense(harness_list: list):
     """Checks that all CombinationalHarnesses in harness_list have the same unateness."""
-    for harness in harness_list:
-        if not harness.timing_sense == harness_list[0].timing_sense:
-            return "non_unate"
-    return harness_list[0].timing_sense
+    timing_sense = harness_list[0].timing_sense
+    if all(harness.timing_sense == timing_sense for harness in harness_list):
+        return timing_sense
+    return "non_unate"
@@ -110,14 +110,14 @@ def _parse(tokens: list) -> list:
     
     # Now that we know the production rules, produce an AST in prefix format
     syntax_tree = []
-    named_tokens = [n for n in tokens if n.type == T_OTHER]
+    named_tokens = iter([n for n in tokens if n.type == T_OTHER])
     for rule in rule_sequence:
         if rule == 0:
             syntax_tree.extend(['O', '~'])
         elif rule == 1:
             syntax_tree.append('O')
         elif rule == 2:
-            syntax_tree.extend(['O', named_tokens.pop(0).symbol])
+            syntax_tree.extend(['O', next(named_tokens).symbol])
         elif rule == 3:
             last_O_index = -1 - [t for t in reversed(syntax_tree)].index('O')
             syntax_tree.insert(last_O_index+1, '&')
@@ -138,19 +138,19 @@ def _parse(tokens: list) -> list:
 def _lex(expression: str) -> list:
     """Convert a simple boolean logic expression into tokens"""
     tokens = []
-    temp = ''
+    temp = []
     for c in ''.join(expression.split()):
         if c in ['~', '!', '(', ')', '|', '&', '^']:
             if temp:
-                tokens.append(Token(temp))
-                temp = ''
+                tokens.append(Token(''.join(temp)))
+                temp = []
             tokens.append(Token(c))
         elif c.isalnum() or c == '_':
-            temp += c
+            temp.append(c)
         else:
             raise ValueError(f'Invalid character in boolean expression: {c}')
     if temp:
-        tokens.append(Token(temp))
+        tokens.append(Token(''.join(temp)))
     return tokens
 
 def parse_logic(expression: str) -> list:
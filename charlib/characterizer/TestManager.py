@@ -1,5 +1,8 @@
 """This module contains test managers for various types of standard cells"""
 
+import logging
+import re
+from functools import lru_cache
 from itertools import product
 from pathlib import Path
 
@@ -11,10 +14,26 @@ from PySpice.Spice.unit import str_spice
 from PySpice.Unit import *
 
 from charlib.characterizer.functions import Function, registered_functions
-from charlib.characterizer.Harness import CombinationalHarness, SequentialHarness, filter_harnesses_by_ports, find_harness_by_arc
+from charlib.characterizer.Harness import CombinationalHarness, SequentialHarness, build_harness_index, find_harness_by_arc
 from charlib.characterizer.LogicParser import parse_logic
 from charlib.liberty.cell import Cell, Pin, TimingData, TableTemplate
 
+logger = logging.getLogger(__name__)
+
+# Matches subcircuit instance lines in a netlist
+_INSTANCE_RE = re.compile(r'^[xX].*$', re.MULTILINE)
+# Settings attributes holding the logic thresholds used to measure each transition direction
+_PROP_THRESHOLD = {'rise': 'logic_threshold_low_to_high', 'fall': 'logic_threshold_high_to_low'}
+_TRANS_THRESHOLDS = {
+    'rise': ('logic_threshold_low', 'logic_threshold_high'),
+    'fall': ('logic_threshold_high', 'logic_threshold_low')
+}
+# Nodes driving stable input ports for each logic state
+_STABLE_NODES = {'1': 'vhigh', '0': 'vlow'}
+# Fractions of vdd between which an output is considered to have stabilized
+_STABILIZED_BOUNDS = {'rise': (0.01, 0.99), 'fall': (0.99, 0.01)}
+_CLOCK_DIRECTION = {'rising_edge': 'rise', 'falling_edge': 'fall'}
+
 class TestManager:
     """A test manager for a standard cell"""
     def __init__ (self, name: str, in_ports: str|list, out_ports: list|None, functions: str|list, **kwargs):
@@ -149,20 +168,18 @@ class TestManager:
             if not Path(value).is_file():
                 raise ValueError(f'Invalid value for netlist: {value} is not a file')
             self._netlist = Path(value)
+            self._definition = None
+            self._used_models = None
         else:
             raise TypeError(f'Invalid type for netlist: {type(value)}')
 
     def definition(self) -> str:
         """Return the cell's spice definition"""
-        # Search the netlist file for the circuit definition
-        with open(self.netlist, 'r') as file:
-            for line in file:
-                if self.cell.name in line.upper() and 'SUBCKT' in line.upper():
-                    file.close()
-                    return line
-            # If we reach this line before returning, the netlist file doesn't contain a circuit definition
-            file.close()
-            raise ValueError(f'No cell definition found in netlist {self.netlist}')
+        if self._definition is None:
+            self._scan_netlist()
+            if self._definition is None:
+                raise ValueError(f'No cell definition found in netlist {self.netlist}')
+        return self._definition
 
     def instance(self) -> str:
         """Return a subcircuit instantiation for this cell."""
@@ -175,18 +192,30 @@ class TestManager:
 
     def used_models(self) -> list:
         """Return a list of subcircuits used by this cell."""
+        if self._used_models is None:
+            self._scan_netlist()
+        return self._used_models
+
+    def _scan_netlist(self):
+        """Read the netlist once, caching the cell definition and the subcircuits it uses.
+
+        The netlist is invariant across trials, so this only needs to happen once per netlist."""
+        text = self.netlist.read_text()
+
+        # Find the first line containing both SUBCKT and the cell name
+        definition_re = re.compile(rf'^(?=.*SUBCKT)(?=.*{re.escape(self.cell.name)}).*\n?', re.IGNORECASE | re.MULTILINE)
+        match = definition_re.search(text)
+        self._definition = match.group(0) if match else None
+
+        # Get the subckt name of each instance
+        # This should be the last item that doesn't contain =
         subckts = []
-        with open(self.netlist, 'r') as file:
-            for line in file:
-                if line.lower().startswith('x'):
-                    # Get the subckt name
-                    # This should be the last item that doesn't contain =
-                    for term in reversed(line.split()):
-                        if '=' not in term:
-                            subckts.append(term)
-                            break
-            file.close()
-        return subckts
+        for line in _INSTANCE_RE.findall(text):
+            for term in reversed(line.split()):
+                if '=' not in term:
+                    subckts.append(term)
+                    break
+        self._used_models = subckts
 
     @property
     def in_slews(self) -> list:
@@ -234,13 +263,39 @@ class TestManager:
         """Set a flag that this test manager's results have been exported"""
         self._is_exported = True
 
+    def _connect_dut(self, circuit, settings, harness, extra_nodes: dict=None):
+        """Instantiate the cell under test in circuit as XDUT.
+
+        Target ports, supply ports, and stable input ports are wired to the standard test nodes.
+        extra_nodes optionally maps additional port names to node names. Any other ports are
+        left floating."""
+        ports = self.definition().upper().split()[1:]
+        subcircuit_name = ports.pop(0)
+
+        # Map port names to nodes, adding higher-priority connections last so they take precedence
+        port_map = {pin.pin.name: _STABLE_NODES.get(pin.state) for pin in harness.stable_in_ports}
+        if extra_nodes:
+            port_map.update(extra_nodes)
+        port_map[settings.vss.name.upper()] = 'vss_dyn'
+        port_map[settings.vdd.name.upper()] = 'vdd_dyn'
+        port_map[harness.target_out_port.pin.name] = 'vout'
+        port_map[harness.target_in_port.pin.name] = 'vin'
+
+        connections = []
+        for port in ports:
+            node = port_map.get(port, 'wfloat0') # Float any unrecognized ports
+            if node is None:
+                state = next(pin.state for pin in harness.stable_in_ports if pin.pin.name == port)
+                raise ValueError(f'Invalid state identified during simulation setup for port {port}: {state}')
+            connections.append(node)
+        circuit.X('dut', subcircuit_name, *connections)
+
     def _run_input_capacitance(self, settings, target_pin):
         """Measure the input capacitance of target_pin.
 
         Assuming a black-box model, treat the cell as a grounded capacitor with fixed capacitance.
         Perform an AC sweep on the circuit and evaluate the capacitance as d/ds(i(s)/v(s))."""
-        if not settings.quiet:
-            print(f'Running input_capacitance for pin {target_pin} of cell {self.cell.name}')
+        logger.info('Running input_capacitance for pin %s of cell %s', target_pin, self.cell.name)
         vdd = settings.vdd.voltage * settings.units.voltage
         vss = settings.vss.voltage * settings.units.voltage
         # TODO: Make these values configurable from settings
@@ -263,13 +318,15 @@ class TestManager:
         # Initialize device under test and wire up ports
         ports = self.definition().upper().split()[1:]
         subcircuit_name = ports.pop(0)
+        vdd_name = settings.vdd.name.upper()
+        vss_name = settings.vss.name.upper()
         connections = []
         for port in ports:
             if port == target_pin:
                 connections.append('vin')
-            elif port == settings.vdd.name.upper():
+            elif port == vdd_name:
                 connections.append('vdd')
-            elif port == settings.vss.name.upper():
+            elif port == vss_name:
                 connections.append('vss')
             else:
                 # Add a resistor and capacitor to each output
@@ -278,7 +335,7 @@ class TestManager:
                 connections.append(f'v{port}')
         circuit.X('dut', subcircuit_name, *connections)
 
-        simulator = Simulator.factory(simulator=settings.simulator)
+        simulator = _get_simulator(settings.simulator)
         simulation = simulator.simulation(
             circuit,
             temperature=settings.temperature,
@@ -288,10 +345,7 @@ class TestManager:
         # Log simulation
         # Path should be debug_dir/cell_name/input_capacitance/pin
         if settings.debug:
-            debug_path = settings.debug_dir / self.cell.name / 'input_capacitance'
-            debug_path.mkdir(parents=True, exist_ok=True)
-            with open(debug_path/f'{target_pin}.sp', 'w') as spice_file:
-                spice_file.write(str(simulation))
+            _write_deck(settings.debug_dir / self.cell.name / 'input_capacitance', f'{target_pin}.sp', simulation)
 
         # Measure capacitance as the slope of the conductance
         analysis = simulation.ac('dec', 100, f_start, f_stop)
@@ -325,58 +379,51 @@ class CombinationalTestManager(TestManager):
                 trial_name = f'delay {self.cell.name} {harness.short_str()}'
 
                 # Run delay characterization
-                for slew in self.in_slews:
-                    for load in self.out_loads:
-                        self._run_delay(settings, harness, slew, load, trial_name)
+                for (i, slew), (j, load) in product(enumerate(self.in_slews), enumerate(self.out_loads)):
+                    harness.store_result(i, j, self._run_delay(settings, harness, slew, load, trial_name))
+                harness.finalize_results()
                 unsorted_harnesses.append(harness)
 
             # Filter out harnesses that aren't worst-case conditions
             # We should be left with the critical path rise and fall harnesses for each i/o path
             harnesses = []
+            unsorted_index = build_harness_index(unsorted_harnesses)
             for in_port in self.in_ports:
                 for direction in ['rise', 'fall']:
                     # Iterate over harnesses that match output, input, and direction
-                    matching_harnesses = [harness for harness in filter_harnesses_by_ports(unsorted_harnesses, in_port, out_port) if harness.out_direction == direction]
-                    worst_case_harness = matching_harnesses[0]
-                    for harness in matching_harnesses:
-                        # FIXME: Currently we compare by average prop delay. Consider alternative strategies
-                        if worst_case_harness.average_propagation_delay() < harness.average_propagation_delay():
-                            worst_case_harness = harness # This harness is worse
+                    matching_harnesses = unsorted_index.get((in_port.name, out_port.name, direction), [])
+                    # FIXME: Currently we compare by average prop delay. Consider alternative strategies
+                    worst_case_harness = max(matching_harnesses, key=lambda harness: harness.average_propagation_delay())
                     harnesses.append(worst_case_harness)
 
             # Store propagation and transient delay in pin timing tables
+            # Table indices and templates are the same for every arc
+            harness_index = build_harness_index(harnesses)
+            time_unit = settings.units.time
+            index_1 = [str(slew) for slew in self.in_slews]
+            index_2 = [str(load) for load in self.out_loads]
+            template = _table_template('delay', index_1, index_2, ['input_net_transition', 'total_output_net_capacitance'])
             for in_port in self.in_ports:
                 delay_timing = TimingData(in_port.name)
                 for direction in ['rise', 'fall']:
                     # Identify the correct harness
-                    harness = find_harness_by_arc(harnesses, in_port, out_port, direction)
-
-                    # Construct the table
-                    index_1 = [str(slew) for slew in self.in_slews]
-                    index_2 = [str(load) for load in self.out_loads]
-                    prop_values = []
-                    tran_values = []
-                    for slew in index_1:
-                        for load in index_2:
-                            result = harness.results[slew][load]
-                            prop_value = (result['prop_in_out'] @ u_s).convert(settings.units.time.prefixed_unit).value
-                            prop_values.append(f'{prop_value:7f}')
-                            tran_value = (result['trans_out'] @ u_s).convert(settings.units.time.prefixed_unit).value
-                            tran_values.append(f'{tran_value:7f}')
-                    template = TableTemplate()
-                    template.name = f'delay_template_{len(index_1)}x{len(index_2)}'
-                    template.variables = ['input_net_transition', 'total_output_net_capacitance']
+                    harness = find_harness_by_arc(harnesses, in_port, out_port, direction, harness_index)
+
+                    # Construct the table, converting measurements from seconds to time units
+                    prop_values = _table_values(harness.measurement('prop_in_out'), time_unit)
+                    tran_values = _table_values(harness.measurement('trans_out'), time_unit)
                     delay_timing.add_table(f'cell_{direction}', template, prop_values, index_1, index_2)
                     delay_timing.add_table(f'{direction}_transition', template, tran_values, index_1, index_2)
                 self.cell[out_port.name].timings.append(delay_timing)
 
             # Display plots
             if 'io' in self.plots:
-                [self.plot_io(settings, harness) for harness in harnesses]
+                for harness in harnesses:
+                    self.plot_io(settings, harness)
             if 'delay' in self.plots:
-                [self.cell[out_pin.name].plot_delay(settings, self.cell.name) for out_pin in self.out_ports]
+                self.cell[out_port.name].plot_delay(settings, self.cell.name)
             if 'energy' in self.plots:
-                print("Energy plotting not yet supported") # TODO: Add correct energy measurement procedure
+                logger.warning('Energy plotting not yet supported') # TODO: Add correct energy measurement procedure
             if plt.get_figlabels():
                 plt.tight_layout()
                 plt.show()
@@ -384,19 +431,23 @@ class CombinationalTestManager(TestManager):
         return self.cell
 
     def _run_delay(self, settings, harness: CombinationalHarness, slew, load, trial_name):
-        if not settings.quiet:
-            print(f'Running {trial_name} with slew={slew*settings.units.time}, load={load*settings.units.capacitance}')
-        harness.results[str(slew)][str(load)] = self._run_delay_trial(settings, harness, slew, load)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Running %s with slew=%s, load=%s', trial_name,
+                        slew*settings.units.time, load*settings.units.capacitance)
+        return self._run_delay_trial(settings, harness, slew, load)
 
     def _run_delay_trial(self, settings, harness: CombinationalHarness, slew, load):
         """Run delay measurement for a single trial"""
         # Set up parameters
-        data_slew = slew * settings.units.time
+        units = settings.units
+        time_unit = units.time
+        vdd_voltage = settings.vdd.voltage
+        data_slew = slew * time_unit
         t_start = data_slew
         t_end = t_start + data_slew
         t_simend = 10000 * data_slew
-        vdd = settings.vdd.voltage * settings.units.voltage
-        vss = settings.vss.voltage * settings.units.voltage
+        vdd = vdd_voltage * units.voltage
+        vss = settings.vss.voltage * units.voltage
 
         # Initialize circuit
         circuit = Circuit(f'{self.cell.name}_delay')
@@ -410,38 +461,13 @@ class CombinationalTestManager(TestManager):
         circuit.V('dd_dyn', 'vdd_dyn', circuit.gnd, vdd)
         circuit.V('ss_dyn', 'vss_dyn', circuit.gnd, vss)
         circuit.V('o_cap', 'vout', 'wout', circuit.gnd)
-        circuit.C('0', 'wout', 'vss_dyn', load * settings.units.capacitance)
+        circuit.C('0', 'wout', 'vss_dyn', load * units.capacitance)
 
         # Initialize device under test subcircuit and wire up ports
-        ports = self.definition().upper().split()[1:]
-        subcircuit_name = ports.pop(0)
-        connections = []
-        for port in ports:
-            if port == harness.target_in_port.pin.name:
-                connections.append('vin')
-            elif port == harness.target_out_port.pin.name:
-                connections.append('vout')
-            elif port == settings.vdd.name.upper():
-                connections.append('vdd_dyn')
-            elif port == settings.vss.name.upper():
-                connections.append('vss_dyn')
-            elif port in [pin.pin.name for pin in harness.stable_in_ports]:
-                for stable_port in harness.stable_in_ports:
-                    if port == stable_port.pin.name:
-                        if stable_port.state == '1':
-                            connections.append('vhigh')
-                        elif stable_port.state == '0':
-                            connections.append('vlow')
-                        else:
-                            raise ValueError(f'Invalid state identified during simulation setup for port {port}: {state}')
-            else:
-                connections.append('wfloat0') # Float any unrecognized ports
-        if len(connections) is not len(ports):
-            raise ValueError(f'Failed to match all ports identified in definition "{self.definition().strip()}"')
-        circuit.X('dut', subcircuit_name, *connections)
+        self._connect_dut(circuit, settings, harness)
 
         # Initialize simulation
-        simulator = Simulator.factory(simulator=settings.simulator)
+        simulator = _get_simulator(settings.simulator)
         simulation = simulator.simulation(
             circuit,
             temperature=settings.temperature,
@@ -450,21 +476,10 @@ class CombinationalTestManager(TestManager):
         simulation.options('autostop', 'nopage', 'nomod', post=1, ingold=2, trtol=1)
 
         # Measure delay
-        pct_vdd = lambda x : x * settings.vdd.voltage
-        match harness.in_direction:
-            case 'rise':
-                v_prop_start = settings.logic_threshold_low_to_high
-            case 'fall':
-                v_prop_start = settings.logic_threshold_high_to_low
-        match harness.out_direction:
-            case 'rise':
-                v_prop_end = settings.logic_threshold_low_to_high
-                v_trans_start = settings.logic_threshold_low
-                v_trans_end = settings.logic_threshold_high
-            case 'fall':
-                v_prop_end = settings.logic_threshold_high_to_low
-                v_trans_start = settings.logic_threshold_high
-                v_trans_end = settings.logic_threshold_low
+        pct_vdd = lambda x : x * vdd_voltage
+        v_prop_start = getattr(settings, _PROP_THRESHOLD[harness.in_direction])
+        v_prop_end = getattr(settings, _PROP_THRESHOLD[harness.out_direction])
+        (v_trans_start, v_trans_end) = (getattr(settings, name) for name in _TRANS_THRESHOLDS[harness.out_direction])
         simulation.measure(
             'tran', 'prop_in_out',
             f'trig v(vin) val={pct_vdd(v_prop_start)} {harness.in_direction}=1',
@@ -483,13 +498,11 @@ class CombinationalTestManager(TestManager):
         if settings.debug:
             debug_path = settings.debug_dir / self.cell.name / 'delay' / harness.debug_path / \
                          f'slew_{slew}' / f'load_{load}'
-            debug_path.mkdir(parents=True, exist_ok=True)
-            with open(debug_path/'delay.sp', 'w') as spice_file:
-                spice_file.write(str(simulation))
+            _write_deck(debug_path, 'delay.sp', simulation)
 
         # Run transient analysis
         # TODO: May need to add probes before running?
-        step_time = min(self.sim_timestep*settings.units.time, t_simend/1000)
+        step_time = min(self.sim_timestep*time_unit, t_simend/1000)
         return simulation.transient(step_time=step_time, end_time=t_simend)
 
     def plot_io(self, settings, harness):
@@ -497,12 +510,12 @@ class CombinationalTestManager(TestManager):
         # TODO: Look for ways to generate fewer plots here - maybe a creative 3D plot
         figures = []
         # Group data by slew rate so that inputs are the same
-        for slew in self.in_slews:
+        for i, slew in enumerate(self.in_slews):
             # Generate plots for Vin and Vout
             figure, (ax_i, ax_o) = plt.subplots(2,
                 sharex=True,
                 height_ratios=[3, 7],
-                label=f'{self.cell.name} | {harness.arc_str()} | {str(slew*settings.units.time)}'
+                label=f'{self.cell.name} | {harness.arc_str()} | {slew*settings.units.time}'
             )
             volt_units = str(settings.units.voltage.prefixed_unit)
             time_units = str(settings.units.time.prefixed_unit)
@@ -514,8 +527,8 @@ class CombinationalTestManager(TestManager):
                 ylabel=f'Vout (pin {harness.target_out_port.pin.name}) [{volt_units}]',
                 xlabel=f'Time [{time_units}]'
             )
-            for load in self.out_loads:
-                analysis = harness.results[str(slew)][str(load)]
+            for j, load in enumerate(self.out_loads):
+                analysis = harness.results[i][j]
                 ax_o.plot(analysis.time / settings.units.time, analysis.vout, label=f'Fanout={load*settings.units.capacitance}')
             ax_o.legend()
             ax_i.plot(analysis.time / settings.units.time, analysis.vin)
@@ -655,9 +668,6 @@ class SequentialTestManager(TestManager):
             input_capacitance = self._run_input_capacitance(settings, pin.name) @ u_F
             self.cell[pin.name].capacitance = input_capacitance.convert(settings.units.capacitance.prefixed_unit).value
 
-        # Save test results to cell
-        normalize_t_units = lambda value: (value @ u_s).convert(settings.units.time.prefixed_unit).value
-
         for out_port in self.out_ports:
             unsorted_harnesses = []
             # Generate Harnesses and run characterization
@@ -677,47 +687,37 @@ class SequentialTestManager(TestManager):
                 trial_name = f'delay {self.cell.name} {harness.short_str()}'
 
                 # Run characterization
-                for slew in self.in_slews:
-                    for load in self.out_loads:
-                        harness.results[str(slew)][str(load)] = self._run_delay(settings, harness, slew, load, trial_name)
+                for (i, slew), (j, load) in product(enumerate(self.in_slews), enumerate(self.out_loads)):
+                    harness.store_result(i, j, self._run_delay(settings, harness, slew, load, trial_name))
+                harness.finalize_results()
                 unsorted_harnesses.append(harness)
 
             # TODO: Filter out harnesses that aren't worst-case conditions
             harnesses = unsorted_harnesses
 
             # Store timing results
+            harness_index = build_harness_index(harnesses)
+            time_unit = settings.units.time
+            index_1 = [str(slew) for slew in self.in_slews]
+            index_2 = [str(load) for load in self.out_loads]
+
+            # Set up table templates, which are the same for every arc
+            clock_edge = 'rising' if self.clock_trigger == 'posedge' else 'falling'
+            delay_template = _table_template('delay', index_1, index_2, ['input_net_transition', 'total_output_net_capacitance'])
+            setup_template = _table_template('setup', index_1, index_2, ['related_pin_transition', 'constrained_pin_transition'])
+            hold_template = _table_template('hold', index_1, index_2, setup_template.variables)
             for in_port in self.in_ports: # TODO: Add set and reset
-                index_1 = [str(slew) for slew in self.in_slews]
-                index_2 = [str(load) for load in self.out_loads]
-
-                # Set up timing groups and table templates
-                clock_edge = 'rising' if self.clock_trigger == 'posedge' else 'falling'
-                delay_template = TableTemplate()
-                delay_template.name = f'delay_template_{len(index_1)}x{len(index_2)}'
-                delay_template.variables = ['input_net_transition', 'total_output_net_capacitance']
+                # Set up timing groups
                 delay_timing = TimingData(out_port.name, f'{clock_edge}_edge')
-                setup_template = TableTemplate()
-                setup_template.name = f'setup_template_{len(index_1)}x{len(index_2)}'
-                setup_template.variables = ['related_pin_transition', 'constrained_pin_transition']
                 setup_timing = TimingData(self.clock_name, f'setup_{clock_edge}')
-                hold_template = TableTemplate()
-                hold_template.name = f'hold_template_{len(index_1)}x{len(index_2)}'
-                hold_template.variables = setup_template.variables
                 hold_timing = TimingData(self.clock_name, f'hold_{clock_edge}')
                 for direction in ['rise', 'fall']:
                     # Fetch and format data for timing tables
-                    harness = find_harness_by_arc(harnesses, in_port, out_port, direction)
-                    prop_values = []
-                    tran_values = []
-                    setup_values = []
-                    hold_values = []
-                    for slew in index_1:
-                        for load in index_2:
-                            result = harness.results[slew][load]
-                            prop_values.append(f'{normalize_t_units(result["prop_in_out"]):7f}')
-                            tran_values.append(f'{normalize_t_units(result["trans_out"]):7f}')
-                            setup_values.append(f'{normalize_t_units(result["t_setup"]):7f}')
-                            hold_values.append(f'{normalize_t_units(result["t_hold"]):7f}')
+                    harness = find_harness_by_arc(harnesses, in_port, out_port, direction, harness_index)
+                    prop_values = _table_values(harness.measurement('prop_in_out'), time_unit)
+                    tran_values = _table_values(harness.measurement('trans_out'), time_unit)
+                    setup_values = _table_values(harness.measurement('t_setup'), time_unit)
+                    hold_values = _table_values(harness.measurement('t_hold'), time_unit)
 
                     # Store propagation and transient delays on the output pin
                     delay_timing.add_table(f'cell_{direction}', delay_template, prop_values, index_1, index_2)
@@ -736,9 +736,10 @@ class SequentialTestManager(TestManager):
 
             # Display plots
             if 'io' in self.plots:
-                [self.plot_io(settings, harness) for harness in harnesses]
+                for harness in harnesses:
+                    self.plot_io(settings, harness)
             if 'delay' in self.plots:
-                [self.cell[out_pin.name].plot_delay(settings, self.cell.name) for out_pin in self.out_ports]
+                self.cell[out_port.name].plot_delay(settings, self.cell.name)
             if 'energy' in self.plots:
                 pass # TODO
             if plt.get_figlabels():
@@ -752,11 +753,13 @@ class SequentialTestManager(TestManager):
         # Set up slew and load parameters
         t_slew = slew * settings.units.time
         c_load = load * settings.units.capacitance
-        debug_path = settings.debug_dir / self.cell.name / 'delay' / harness.debug_path / \
-                     f'slew_{slew}' / f'load_{load}'
+        debug_path = None
+        if settings.debug:
+            debug_path = settings.debug_dir / self.cell.name / 'delay' / harness.debug_path / \
+                         f'slew_{slew}' / f'load_{load}'
 
-        if not settings.quiet:
-            print(f'Running sequential {trial_name} with slew={str(t_slew)}, load={str(c_load)}')
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Running sequential %s with slew=%s, load=%s', trial_name, t_slew, c_load)
         t_stab = self._find_stabilizing_time(settings, harness, t_slew, c_load, debug_path)
         (t_setup, t_hold) = self._find_setup_hold_delay(settings, harness, t_slew, c_load, t_stab, debug_path)
 
@@ -779,13 +782,7 @@ class SequentialTestManager(TestManager):
         sim, t = self._build_test_circuit('stabilizing', settings, harness, t_slew, c_load, t_setup, t_hold, t_stab)
 
         # Measure time it takes for Q to stabilize
-        match harness.out_direction:
-            case 'rise':
-                v_start = 0.01 * settings.vdd.voltage
-                v_end = 0.99 * settings.vdd.voltage
-            case 'fall':
-                v_start = 0.99 * settings.vdd.voltage
-                v_end = 0.01 * settings.vdd.voltage
+        (v_start, v_end) = (x * settings.vdd.voltage for x in _STABILIZED_BOUNDS[harness.out_direction])
         sim.measure(
             'tran', 't_stabilizing',
             f'trig v(vout) val={v_start} {harness.out_direction}=1',
@@ -795,9 +792,7 @@ class SequentialTestManager(TestManager):
 
         # Log simulation
         if settings.debug:
-            debug_path.mkdir(parents=True, exist_ok=True)
-            with open(debug_path/'stabilizing.sp', 'w') as spice_file:
-                spice_file.write(str(sim))
+            _write_deck(debug_path, 'stabilizing.sp', sim)
 
         step_time = t['sim_end']/5000 # Run with low precision
         results = sim.transient(step_time=step_time, end_time=t['sim_end'])
@@ -929,40 +924,15 @@ class SequentialTestManager(TestManager):
             circuit.V('sin', 'vsin', circuit.gnd, vdd if harness.set.state == '1' else vss)
 
         # Initialize device under test subcircuit and wire up ports
-        ports = self.definition().upper().split()[1:]
-        connections = [ports.pop(0)]
-        for port in ports:
-            if port == harness.target_in_port.pin.name:
-                connections.append('vin')
-            elif port == harness.target_out_port.pin.name:
-                connections.append('vout')
-            elif port == settings.vdd.name.upper():
-                connections.append('vdd_dyn')
-            elif port == settings.vss.name.upper():
-                connections.append('vss_dyn')
-            elif port == harness.clock.pin.name:
-                connections.append('vcin')
-            elif self.reset and port == harness.reset.pin.name:
-                connections.append('vrin')
-            elif self.set and port == harness.set.pin.name:
-                connections.append('vsin')
-            elif port in [pin.pin.name for pin in harness.stable_in_ports]:
-                for stable_port in harness.stable_in_ports:
-                    if port == stable_port.pin.name:
-                        if stable_port.state == '1':
-                            connections.append('vhigh')
-                        elif stable_port.state == '0':
-                            connections.append('vlow')
-                        else:
-                            raise ValueError(f'Invalid state identified during simulation setup for port {port}: {state}')
-            else:
-                connections.append('wfloat0') # Float any unrecognized ports
-        if len(connections) is not len(ports)+1:
-            raise ValueError(f'Failed to match all ports identified in definition "{self.definition().strip()}"')
-        circuit.X('dut', *connections)
+        control_nodes = {harness.clock.pin.name: 'vcin'}
+        if self.reset:
+            control_nodes[harness.reset.pin.name] = 'vrin'
+        if self.set:
+            control_nodes[harness.set.pin.name] = 'vsin'
+        self._connect_dut(circuit, settings, harness, control_nodes)
 
         # Initialize simulation
-        simulator = Simulator.factory(simulator=settings.simulator)
+        simulator = _get_simulator(settings.simulator)
         simulation = simulator.simulation(
             circuit,
             temperature=settings.temperature,
@@ -976,27 +946,11 @@ class SequentialTestManager(TestManager):
 
         # Set up voltage bounds for measurements
         pct_vdd = lambda x : x * settings.vdd.voltage
-        match harness.in_direction:
-            case 'rise':
-                v_prop_start = settings.logic_threshold_low_to_high
-            case 'fall':
-                v_prop_start = settings.logic_threshold_high_to_low
-        match harness.out_direction:
-            case 'rise':
-                v_prop_end = settings.logic_threshold_low_to_high
-                v_trans_start = settings.logic_threshold_low
-                v_trans_end = settings.logic_threshold_high
-            case 'fall':
-                v_prop_end = settings.logic_threshold_high_to_low
-                v_trans_start = settings.logic_threshold_high
-                v_trans_end = settings.logic_threshold_low
-        match harness.timing_type_clock:
-            case 'rising_edge':
-                clk_direction = 'rise'
-                v_clk_transition = settings.logic_threshold_low_to_high
-            case 'falling_edge':
-                clk_direction = 'fall'
-                v_clk_transition = settings.logic_threshold_high_to_low
+        v_prop_start = getattr(settings, _PROP_THRESHOLD[harness.in_direction])
+        v_prop_end = getattr(settings, _PROP_THRESHOLD[harness.out_direction])
+        (v_trans_start, v_trans_end) = (getattr(settings, name) for name in _TRANS_THRESHOLDS[harness.out_direction])
+        clk_direction = _CLOCK_DIRECTION[harness.timing_type_clock]
+        v_clk_transition = getattr(settings, _PROP_THRESHOLD[clk_direction])
 
         # Measure propagation delay from first data edge to last output edge
         simulation.measure(
@@ -1032,9 +986,7 @@ class SequentialTestManager(TestManager):
 
         # Log simulation
         if settings.debug:
-            debug_path.mkdir(parents=True, exist_ok=True)
-            with open(debug_path/'delay.sp', 'w') as spice_file:
-                spice_file.write(str(simulation))
+            _write_deck(debug_path, 'delay.sp', simulation)
 
         step_time = min(self.sim_timestep*settings.units.time, timings['sim_end']/1000)
         simulation.options('autostop', 'nopage', 'nomod', post=1, ingold=2)
@@ -1044,18 +996,9 @@ class SequentialTestManager(TestManager):
         """Measure Clock-to-Q delay."""
 
         # Measure clock-to-latch time
-        match harness.timing_type_clock:
-            case 'rising_edge':
-                clk_direction = 'rise'
-                v_clk_transition = settings.logic_threshold_low_to_high * settings.vdd.voltage
-            case 'falling_edge':
-                clk_direction = 'fall'
-                v_clk_transition = settings.logic_threshold_high_to_low * settings.vdd.voltage
-        match harness.out_direction:
-            case 'rise':
-                v_prop_end = settings.logic_threshold_low_to_high * settings.vdd.voltage
-            case 'fall':
-                v_prop_end = settings.logic_threshold_high_to_low * settings.vdd.voltage
+        clk_direction = _CLOCK_DIRECTION[harness.timing_type_clock]
+        v_clk_transition = getattr(settings, _PROP_THRESHOLD[clk_direction]) * settings.vdd.voltage
+        v_prop_end = getattr(settings, _PROP_THRESHOLD[harness.out_direction]) * settings.vdd.voltage
         simulation.measure('tran', 't_c2q',
             f'trig v(vcin) val={v_clk_transition} td={float(timings["removal"])} {clk_direction}=last',
             f'targ v(vout) val={v_prop_end} {harness.out_direction}=last',
@@ -1064,10 +1007,7 @@ class SequentialTestManager(TestManager):
 
         # Log simulation
         if settings.debug:
-            debug_path = debug_path / 'c2q'
-            debug_path.mkdir(parents=True, exist_ok=True)
-            with open(debug_path/f'{simulation.circuit.title}.sp', 'w') as spice_file:
-                spice_file.write(str(simulation))
+            _write_deck(debug_path / 'c2q', f'{simulation.circuit.title}.sp', simulation)
 
         step_time = min(self.sim_timestep*settings.units.time, t['sim_end']/1000)
         simulation.options('autostop', 'nopage', 'nomod', post=1, ingold=2)
@@ -1078,78 +1018,88 @@ class SequentialTestManager(TestManager):
         # TODO: Look for ways to generate fewer plots here - maybe a creative 3D plot
         figures = []
         # Group data by slew rate so that inputs are the same
-        for slew in self.in_slews:
-            for load in self.out_loads:
-                # Add axes for clk, s, r, d, q (in that order)
-                # Use an additive approach in case some of those aren't present
-                num_axes = 1
-                CLK = 0
-                if self.set:
-                    S = num_axes
-                    num_axes += 1
-                if self.reset:
-                    R = num_axes
-                    num_axes += 1
-                D = num_axes
+        for (i, slew), (j, load) in product(enumerate(self.in_slews), enumerate(self.out_loads)):
+            # Add axes for clk, s, r, d, q (in that order)
+            # Use an additive approach in case some of those aren't present
+            num_axes = 1
+            CLK = 0
+            if self.set:
+                S = num_axes
                 num_axes += 1
-                Q = num_axes
+            if self.reset:
+                R = num_axes
                 num_axes += 1
-                ratios = np.ones(num_axes).tolist()
-                ratios[-1] = num_axes
-                figure, axes = plt.subplots(num_axes,
-                    sharex=True,
-                    height_ratios=ratios,
-                    label=f'{self.cell.name} | {harness.short_str()}'
-                )
-
-                # Set up plots
-                for ax in axes:
-                    for level in [settings.logic_threshold_low, settings.logic_threshold_high]:
-                        ax.axhline(level*settings.vdd.voltage, color='0.5', linestyle='--')
-                    # TODO: Set up vlines for important timing events
-                    ax.set_yticks([settings.vss.voltage, settings.vdd.voltage])
-                volt_units = str(settings.units.voltage.prefixed_unit)
-                time_units = str(settings.units.time.prefixed_unit)
-                axes[CLK].set(
-                    title=f'Slew Rate: {str(slew*settings.units.time)} | Fanout: {str(load*settings.units.capacitance)}',
-                    ylabel=f'CLK [{volt_units}]'
-                )
-                if self.set:
-                    axes[S].set_ylabel(f'S [{volt_units}]')
-                if self.reset:
-                    axes[R].set_ylabel(f'R [{volt_units}]')
-                axes[D].set_ylabel(f'D [{volt_units}]')
-                axes[Q].set_ylabel(f'Q [{volt_units}]')
-                axes[-1].set_xlabel(f'Time [{str(settings.units.time.prefixed_unit)}]')
-                analysis = harness.results[str(slew)][str(load)]
-                t = analysis.time / settings.units.time
-                axes[CLK].plot(t, analysis.vcin)
-                if self.set:
-                    axes[S].plot(t, analysis.vsin)
-                if self.reset:
-                    axes[R].plot(t, analysis.vrin)
-                axes[D].plot(t, analysis.vin)
-                axes[Q].plot(t, analysis.vout)
+            D = num_axes
+            num_axes += 1
+            Q = num_axes
+            num_axes += 1
+            ratios = np.ones(num_axes).tolist()
+            ratios[-1] = num_axes
+            figure, axes = plt.subplots(num_axes,
+                sharex=True,
+                height_ratios=ratios,
+                label=f'{self.cell.name} | {harness.short_str()}'
+            )
 
-                figures.append(figure)
+            # Set up plots
+            for ax in axes:
+                for level in [settings.logic_threshold_low, settings.logic_threshold_high]:
+                    ax.axhline(level*settings.vdd.voltage, color='0.5', linestyle='--')
+                # TODO: Set up vlines for important timing events
+                ax.set_yticks([settings.vss.voltage, settings.vdd.voltage])
+            volt_units = str(settings.units.voltage.prefixed_unit)
+            axes[CLK].set(
+                title=f'Slew Rate: {slew*settings.units.time} | Fanout: {load*settings.units.capacitance}',
+                ylabel=f'CLK [{volt_units}]'
+            )
+            if self.set:
+                axes[S].set_ylabel(f'S [{volt_units}]')
+            if self.reset:
+                axes[R].set_ylabel(f'R [{volt_units}]')
+            axes[D].set_ylabel(f'D [{volt_units}]')
+            axes[Q].set_ylabel(f'Q [{volt_units}]')
+            axes[-1].set_xlabel(f'Time [{settings.units.time.prefixed_unit}]')
+            analysis = harness.results[i][j]
+            t = analysis.time / settings.units.time
+            axes[CLK].plot(t, analysis.vcin)
+            if self.set:
+                axes[S].plot(t, analysis.vsin)
+            if self.reset:
+                axes[R].plot(t, analysis.vrin)
+            axes[D].plot(t, analysis.vin)
+            axes[Q].plot(t, analysis.vout)
+
+            figures.append(figure)
         return figures
 
+@lru_cache(maxsize=None)
+def _get_simulator(name: str):
+    """Return a simulator for the named backend.
+
+    Simulators are reused for every simulation run by this process, so the backend (e.g. the
+    ngspice shared library) is only initialized once per worker."""
+    return Simulator.factory(simulator=name)
+
+def _write_deck(debug_path, file_name, simulation):
+    """Write a simulation's spice deck to debug_path/file_name for debugging"""
+    debug_path.mkdir(parents=True, exist_ok=True)
+    with open(debug_path / file_name, 'w') as spice_file:
+        spice_file.write(str(simulation))
+
+def _table_template(kind: str, index_1: list, index_2: list, variables: list) -> TableTemplate:
+    """Create a TableTemplate named for its kind and dimensions"""
+    template = TableTemplate()
+    template.name = f'{kind}_template_{len(index_1)}x{len(index_2)}'
+    template.variables = variables
+    return template
+
+def _table_values(values, unit) -> list:
+    """Convert an array of SI values to a flat list of floats in unit"""
+    return (values / float(unit)).ravel().tolist()
+
 def _flip_direction(direction: str) -> str:
     return 'fall' if direction == 'rise' else 'rise'
 
-def _gen_graycode(length: int):
-    """Generate the list of Gray Codes of specified length"""
-    if length <= 1:
-        return [[0],[1]]
-    inputs = []
-    for j in _gen_graycode(length-1):
-        j.insert(0, 0)
-        inputs.append(j)
-    for j in reversed(_gen_graycode(length-1)):
-        j.insert(0, 1)
-        inputs.append(j)
-    return inputs
-
 def _parse_triggered_pin(value: str, role: str) -> (str, Pin):
     """Parses input pin names with trigger types, e.g. 'posedge CLK'"""
     if not isinstance(value, str):
@@ -1,6 +1,9 @@
 """Maps logic functions to truth tables and test vectors."""
 
 import re
+from functools import lru_cache
+
+_OPERAND_RE = re.compile(r'(\w+)')
 
 registered_expressions = {
     'BUF': 'a',
@@ -41,31 +44,24 @@ class Function:
     @property
     def operands(self) -> list:
         """Return a list of operand names"""
-        return list(set(re.findall(r'(\w+)', self.expression)))
+        return list(_operands(self.expression))
 
     def eval(self, **inputs) -> bool:
         """Evaluate this function for the given inputs"""
-        operands = self.operands
+        operands = _operands(self.expression)
         if not len(inputs) == len(operands):
             raise ValueError(f'Expected {len(operands)} inputs for function {self.expression}, got {len(inputs)}')
-        f = eval(f'lambda {",".join(operands)}: int({self.expression.replace("~", " not ")})')
-        return f(**inputs)
+        return _compile(self.expression)(**inputs)
 
     def truth_table(self) -> list:
         """Return a truth table for this function"""
-        table = []
-        length = len(self.operands)
-        for n in range(2**length):
-            input_vector = [int(c) for c in f'{n:0{length}b}']
-            result = self.eval(**dict(zip(self.operands, input_vector)))
-            table.append([input_vector, result])
-        return table
+        return [[list(input_vector), result] for input_vector, result in _truth_table(self.expression)]
 
     def __eq__(self, other) -> bool:
         """Compare two functions by checking that their truth tables are the same."""
         result = False
         try:
-            result = self.truth_table() == other.truth_table()
+            result = _truth_table(self.expression) == _truth_table(other.expression)
         except AttributeError:
             # other is probably not a Function object; assume it's a str expression instead
             result = self == Function(other) # Recurse
@@ -103,10 +99,9 @@ class Function:
         # TODO: Make this more efficient
         test_vectors = []
         table = self.truth_table()
-        while table:
-            row = table.pop(0) # Get top row of table
+        for n, row in enumerate(table):
             # Compare to each later row with a differing output
-            for compared_row in [r for r in table if not r[1] == row[1]]:
+            for compared_row in [r for r in table[n+1:] if not r[1] == row[1]]:
                 # Check if input differs by only one pin
                 delta_row = []
                 delta_count = 0
@@ -125,10 +120,32 @@ class Function:
         return test_vectors
 
 
+# Operands, compiled evaluators and truth tables depend only on the expression string, so
+# they are cached per expression rather than recomputed for every call and every Function
+@lru_cache(maxsize=None)
+def _operands(expression: str) -> tuple:
+    """Return the operand names in expression"""
+    return tuple(set(_OPERAND_RE.findall(expression)))
+
+@lru_cache(maxsize=None)
+def _compile(expression: str):
+    """Compile expression into a function of its operands"""
+    return eval(f'lambda {",".join(_operands(expression))}: int({expression.replace("~", " not ")})')
+
+@lru_cache(maxsize=None)
+def _truth_table(expression: str) -> tuple:
+    """Return the truth table for expression as a tuple of (input_vector, result) pairs"""
+    operands = _operands(expression)
+    f = _compile(expression)
+    length = len(operands)
+    table = []
+    for n in range(2**length):
+        input_vector = tuple(int(c) for c in f'{n:0{length}b}')
+        table.append((input_vector, f(**dict(zip(operands, input_vector)))))
+    return tuple(table)
+
+
 def generate_yml():
     """Generates a YAML map of the registered expressions"""
-    document = ""
-    for name, expr in registered_expressions.items():
-        func = Function(expr)
-        document += func.to_yaml(name) + "\n"
-    print(document)
+    document = [f'{Function(expr).to_yaml(name)}\n' for name, expr in registered_expressions.items()]
+    print(''.join(document))
@@ -1,7 +1,7 @@
 #! /usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import argparse, os, re, yaml
+import argparse, re, yaml
 from pathlib import Path
 
 import matplotlib.pyplot as plt
@@ -37,6 +37,8 @@ def main():
             help='Place the characterization results in the specified file')
     parser_characterize.add_argument('--multithreaded', action='store_true',
             help='Enable multithreaded execution')
+    parser_characterize.add_argument('-j', '--jobs', type=int, default=None,
+            help='The maximum number of cells to characterize in parallel. Defaults to the number of CPUs')
     parser_characterize.add_argument('--comparewith', type=str, default='',
             help='A liberty file to compare results with')
     parser_characterize.add_argument('-f', '--filters', nargs='*',
@@ -72,7 +74,7 @@ def run_charlib(args):
 
     # Search for a YAML file with the required config information
     if not args.quiet:
-        print(f'Searching for YAML files in {str(library_dir)}')
+        print(f'Searching for YAML files in {library_dir}')
     config = None
     if Path(library_dir).is_file():
         filelist=[library_dir]
@@ -82,18 +84,17 @@ def run_charlib(args):
         try:
             with open(file, 'r') as f:
                 config = yaml.safe_load(f)
-                f.close()
         except yaml.YAMLError as e:
             if not args.quiet:
                 print(e)
-                print(f'Skipping "{str(file)}": file contains invalid YAML')
+                print(f'Skipping "{file}": file contains invalid YAML')
             continue
         if config.keys() >= {'settings', 'cells'}:
             break # We have found a YAML file with config information
     if not config:
         raise FileNotFoundError(f'Unable to locate a YAML file containing configuration settings in {library_dir} or its subdirectories.')
     if not args.quiet:
-        print(f'Reading configuration found in "{str(file)}"')
+        print(f'Reading configuration found in "{file}"')
 
     # Read in library settings
     settings = config['settings']
@@ -106,31 +107,35 @@ def run_charlib(args):
     characterizer.settings.debug = characterizer.settings.debug or args.debug
     characterizer.settings.quiet = characterizer.settings.quiet or args.quiet
     characterizer.settings.use_multithreaded = characterizer.settings.use_multithreaded or args.multithreaded
+    characterizer.settings.jobs = args.jobs or characterizer.settings.jobs
 
     # Filter list of cells based on cell_filters
     if args.filters:
-        filtered_cells = {}
-        for name in cells:
-            # Check cell name against filters until we get a match
-            for regex_string in args.filters:
-                if re.search(regex_string, name):
-                    # If we have a match, add to our new set of cells and quit searching
-                    filtered_cells[name] = cells[name]
-                    break
+        # Compile each filter once rather than for every cell name
+        patterns = [re.compile(regex_string) for regex_string in args.filters]
+        filtered_cells = {name: properties for name, properties in cells.items()
+                          if any(pattern.search(name) for pattern in patterns)}
         # Make sure we didn't filter out all cells
         if not filtered_cells:
             raise ValueError(f'Filtering with "{args.filters}" leaves no cells to characterize!')
         cells = filtered_cells
 
     # Read cells
+    library_files = None
     for name, properties in cells.items():
         # If properties is a (name, filepath) pair, fetch cell config from YAML at filepath
         if isinstance(properties, str):
             # Search within library_dir for the specified file
-            for file in Path(library_dir).rglob(properties):
-                with open(file, 'r') as f:
-                    properties = yaml.safe_load(f)
-                    f.close()
+            # Walk the directory tree once and reuse the file list for every cell
+            if library_files is None:
+                library_root = Path(library_dir)
+                library_files = [(path, path.relative_to(library_root))
+                                 for path in library_root.rglob('*') if path.is_file()]
+            # Match relative to library_dir, as rglob would, so library_dir itself can't match
+            for file, relative_path in library_files:
+                if relative_path.match(properties):
+                    with open(file, 'r') as f:
+                        properties = yaml.safe_load(f)
                     break # Quit searching after successfully reading a match
 
         # Merge settings.cell_defaults into properties, keeping entries from properties
@@ -167,7 +172,7 @@ def run_charlib(args):
     with open(libfile_name, 'w') as libfile:
         libfile.write(str(library))
         if not characterizer.settings.quiet:
-             print(f'Results written to {str(libfile_name.resolve())}')
+             print(f'Results written to {libfile_name.resolve()}')
 
     # Run any post-characterization analysis
     if args.comparewith:
@@ -185,41 +190,32 @@ def compare(benchmark, characterized):
     charlib_fall_trans_data = []
     benchmark_fall_trans_data = []
 
-    benchmark_lib = parse_liberty(open(Path(benchmark), 'r').read())
+    benchmark_lib = parse_liberty(Path(benchmark).read_text())
     characterized_lib = parse_liberty(str(characterized))
 
     # Iterate over cells
+    benchmark_cells = _index_groups(benchmark_lib.get_groups('cell'), lambda cell: cell.args[0])
     for charlib_cell in characterized_lib.get_groups('cell'):
         # Find this cell in the benchmark lib
-        benchmark_cell = None
-        for cell in benchmark_lib.get_groups('cell'):
-            if cell.args[0] == charlib_cell.args[0]:
-                benchmark_cell = cell
-                break
+        benchmark_cell = benchmark_cells.get(charlib_cell.args[0])
         if benchmark_cell is None:
-            print(f'Skipping cell "{charlib_cell.args[0]}": not found in {str(benchmark)}.')
+            print(f'Skipping cell "{charlib_cell.args[0]}": not found in {benchmark}.')
             continue # Skip to next cell
 
         # Iterate over pins
+        benchmark_pins = _index_groups(benchmark_cell.get_groups('pin'), lambda pin: pin.args[0])
         for charlib_pin in charlib_cell.get_groups('pin'):
             # Find the pin on the benchmark cell
-            benchmark_pin = None
-            for pin in benchmark_cell.get_groups('pin'):
-                if pin.args[0] == charlib_pin.args[0]:
-                    benchmark_pin = pin
-                    break
+            benchmark_pin = benchmark_pins.get(charlib_pin.args[0])
             if benchmark_pin is None:
-                print(f'Skipping pin "{charlib_cell.args[0]}.{charlib_pin.args[0]}": not found in {str(benchmark)}')
+                print(f'Skipping pin "{charlib_cell.args[0]}.{charlib_pin.args[0]}": not found in {benchmark}')
                 continue # Skip to next pin
 
             # Iterate over timings
+            benchmark_timings = _index_groups(benchmark_pin.get_groups('timing'), lambda timing: timing['related_pin'])
             for charlib_timing in charlib_pin.get_groups('timing'):
                 # Find the timing on the benchmark pin
-                benchmark_timing = None
-                for timing in benchmark_pin.get_groups('timing'):
-                    if timing['related_pin'] == charlib_timing['related_pin']:
-                        benchmark_timing = timing
-                        break
+                benchmark_timing = benchmark_timings.get(charlib_timing['related_pin'])
                 if benchmark_timing is None:
                     print(f'Skipping timing for {charlib_cell.args[0]}.{charlib_pin.args[0]}.{charlib_timing["related_pin"]}')
                     continue
@@ -277,10 +273,10 @@ def compare(benchmark, characterized):
     rise_tran_ae = np.abs(np.asarray(charlib_rise_trans_data) - np.asarray(benchmark_rise_trans_data))
     fall_tran_ae = np.abs(np.asarray(charlib_fall_trans_data) - np.asarray(benchmark_fall_trans_data))
     # Calculate worst case absolute error
-    rise_prop_max_ae = max(rise_prop_ae)
-    fall_prop_max_ae = max(fall_prop_ae)
-    rise_tran_max_ae = max(rise_tran_ae)
-    fall_tran_max_ae = max(fall_tran_ae)
+    rise_prop_max_ae = np.max(rise_prop_ae)
+    fall_prop_max_ae = np.max(fall_prop_ae)
+    rise_tran_max_ae = np.max(rise_tran_ae)
+    fall_tran_max_ae = np.max(fall_tran_ae)
     # Calculate mean absolute error
     rise_prop_mae = np.mean(rise_prop_ae)
     fall_prop_mae = np.mean(fall_prop_ae)
@@ -292,6 +288,13 @@ def compare(benchmark, characterized):
     print('Rise tran', rise_tran_max_ae, rise_tran_mae)
     print('Fall tran', fall_tran_max_ae, fall_tran_mae)
 
+def _index_groups(groups, key) -> dict:
+    """Map key(group) to the first liberty group with that key"""
+    index = {}
+    for group in groups:
+        index.setdefault(key(group), group)
+    return index
+
 if __name__ == '__main__':
     main()
 
@@ -1,5 +1,46 @@
 from PySpice import Unit
 
+# Valid unit symbols for each quantity, in the order they are checked (case-insensitive)
+_SYMBOLS = {
+    'voltage': ('v', 'volts'),
+    'capacitance': ('f', 'farads'),
+    'resistance': ('ω', 'ohm', 'ohms'),
+    'current': ('a', 'amp', 'amps'),
+    'time': ('seconds', 's'),
+    'leakage power': ('w', 'watts'),
+    'energy': ('j', 'joules'),
+}
+
+# Metric prefixes and their exponents
+_PREFIXES = [
+    (('yocto', 'y'),     -24),
+    (('zepto', 'z'),     -21),
+    (('atto', 'a'),      -18),
+    (('femto', 'f'),     -15),
+    (('pico', 'p'),      -12),
+    (('nano', 'n'),       -9),
+    (('micro', 'u', 'μ'), -6),
+    (('milli', 'm'),      -3),
+    (('',),                0),
+    (('kilo', 'k'),        3),
+    (('mega', 'M'),        6),
+    (('giga', 'G'),        9),
+    (('tera', 'T'),       12),
+    (('peta', 'P'),       15),
+    (('exa', 'E'),        18),
+    (('zetta', 'Z'),      21),
+    (('yotta', 'Y'),      24)
+]
+_PREFIX_EXPONENTS = {prefix: exponent for (prefixes, exponent) in _PREFIXES for prefix in prefixes}
+
+def _strip_symbol(value: str, quantity: str) -> str:
+    """Remove the unit symbol for quantity from value, leaving only the metric prefix"""
+    lower_value = value.lower()
+    for symbol in _SYMBOLS[quantity]:
+        if lower_value.endswith(symbol):
+            return value[:-len(symbol)]
+    raise ValueError(f'Invalid {quantity} unit: {value}')
+
 class UnitsSettings:
     def __init__(self, **kwargs) -> None:
         # Initialize using setters
@@ -14,13 +55,13 @@ class UnitsSettings:
 
     def __str__(self) -> str:
         lines = []
-        lines.append(f'Voltage unit:     {str(self.voltage)}')
-        lines.append(f'Current unit:     {str(self.current)}')
-        lines.append(f'Resistance unit:  {str(self.resistance)}')
-        lines.append(f'Capacitance unit: {str(self.capacitance)}')
-        lines.append(f'Time unit:        {str(self.time)}')
-        lines.append(f'Energy unit:      {str(self.energy)}')
-        lines.append(f'Power unit:       {str(self.power)}')
+        lines.append(f'Voltage unit:     {self.voltage}')
+        lines.append(f'Current unit:     {self.current}')
+        lines.append(f'Resistance unit:  {self.resistance}')
+        lines.append(f'Capacitance unit: {self.capacitance}')
+        lines.append(f'Time unit:        {self.time}')
+        lines.append(f'Energy unit:      {self.energy}')
+        lines.append(f'Power unit:       {self.power}')
         return '\n'.join(lines)
 
     @property
@@ -30,13 +71,7 @@ class UnitsSettings:
     @voltage.setter
     def voltage(self, value):
         # Valid symbols are "V" or "Volts"
-        if value.lower().endswith('v'):
-            prefix_str = value.removesuffix(value[-1])
-        elif value.lower().endswith('volts'):
-            prefix_str = value.removesuffix(value[-5:])
-        else:
-            raise ValueError(f'Invalid voltage unit: {value}')
-        self._voltage = self._parse_unit(prefix_str, Unit.u_V)
+        self._voltage = self._parse_unit(_strip_symbol(value, 'voltage'), Unit.u_V)
 
     @property
     def capacitance(self):
@@ -45,13 +80,7 @@ class UnitsSettings:
     @capacitance.setter
     def capacitance(self, value: str):
         # Valid symbols are "F" or "Farads"
-        if value.lower().endswith('f'):
-            prefix_str = value.removesuffix(value[-1])
-        elif value.lower().endswith('farads'):
-            prefix_str = value.removesuffix(value[-6:])
-        else:
-            raise ValueError(f'Invalid capacitance unit: {value}')
-        self._capacitance = self._parse_unit(prefix_str, Unit.u_F)
+        self._capacitance = self._parse_unit(_strip_symbol(value, 'capacitance'), Unit.u_F)
 
     @property
     def resistance(self):
@@ -60,15 +89,7 @@ class UnitsSettings:
     @resistance.setter
     def resistance(self, value: str):
         # Valid symbols are "Ω" or "Ohms"
-        if value.endswith('Ω'):
-            prefix_str = value.removesuffix('Ω')
-        elif value.lower().endswith('ohm'):
-            prefix_str = value.removesuffix(value[-3:])
-        elif value.lower().endswith('ohms'):
-            prefix_str = value.removesuffix(value[-4:])
-        else:
-            raise ValueError(f'Invalid resistance unit: {value}')
-        self._resistance = self._parse_unit(prefix_str, Unit.u_Ω)
+        self._resistance = self._parse_unit(_strip_symbol(value, 'resistance'), Unit.u_Ω)
 
     @property
     def current(self):
@@ -77,15 +98,7 @@ class UnitsSettings:
     @current.setter
     def current(self, value: str):
         # Valid symbols are "A" or "Amps"
-        if value.lower().endswith('a'):
-            prefix_str = value.removesuffix(value[-1])
-        elif value.lower().endswith('amp'):
-            prefix_str = value.removesuffix(value[-3:])
-        elif value.lower().endswith('amps'):
-            prefix_str = value.removesuffix(value[-4:])
-        else:
-            raise ValueError(f'Invalid current unit: {value}')
-        self._current = self._parse_unit(prefix_str, Unit.u_A)
+        self._current = self._parse_unit(_strip_symbol(value, 'current'), Unit.u_A)
 
     @property
     def time(self):
@@ -94,13 +107,7 @@ class UnitsSettings:
     @time.setter
     def time(self, value: str):
         # Valid symbols are "s" or "seconds"
-        if value.lower().endswith('seconds'):
-            prefix_str = value.removesuffix(value[-7:])
-        elif value.lower().endswith('s'):
-            prefix_str = value.removesuffix(value[-1])
-        else:
-            raise ValueError(f'Invalid time unit: {value}')
-        self._time = self._parse_unit(prefix_str, Unit.u_s)
+        self._time = self._parse_unit(_strip_symbol(value, 'time'), Unit.u_s)
 
     @property
     def power(self):
@@ -109,13 +116,7 @@ class UnitsSettings:
     @power.setter
     def power(self, value: str):
         # Valid symbols are "W" or "Watts"
-        if value.lower().endswith('w'):
-            prefix_str = value.removesuffix(value[-1])
-        elif value.lower().endswith('watts'):
-            prefix_str = value.removesuffix(value[-5:])
-        else:
-            raise ValueError(f'Invalid leakage power unit: {value}')
-        self._power = self._parse_unit(prefix_str, Unit.u_W)
+        self._power = self._parse_unit(_strip_symbol(value, 'leakage power'), Unit.u_W)
 
     @property
     def energy(self):
@@ -124,37 +125,12 @@ class UnitsSettings:
     @energy.setter
     def energy(self, value: str):
         # Valid symbols are "J" or "Joules"
-        if value.lower().endswith('j'):
-            prefix_str = value.removesuffix(value[-1])
-        elif value.lower().endswith('joules'):
-            prefix_str = value.removesuffix(value[-6:])
-        else:
-            raise ValueError(f'Invalid energy unit: {value}')
-        self._energy = self._parse_unit(prefix_str, Unit.u_J)
+        self._energy = self._parse_unit(_strip_symbol(value, 'energy'), Unit.u_J)
 
     def _parse_unit(self, prefix_str, unit: callable):
         """Convert a metric prefix to its associated exponent"""
-        lookup_table = [
-            # Prefix             callable
-            (('yocto', 'y'),     -24),
-            (('zepto', 'z'),     -21),
-            (('atto', 'a'),      -18),
-            (('femto', 'f'),     -15),
-            (('pico', 'p'),      -12),
-            (('nano', 'n'),       -9),
-            (('micro', 'u', 'μ'), -6),
-            (('milli', 'm'),      -3),
-            ((''),                 0),
-            (('kilo', 'k'),        3),
-            (('mega', 'M'),        6),
-            (('giga', 'G'),        9),
-            (('tera', 'T'),       12),
-            (('peta', 'P'),       15),
-            (('exa', 'E'),        18),
-            (('zetta', 'Z'),      21),
-            (('yotta', 'Y'),      24)
-        ]
         prefix_str = prefix_str.lower() if len(prefix_str) > 1 else prefix_str # Allow case-insensitive long prefixes
-        for (prefixes, exponent) in lookup_table:
-            if prefix_str in prefixes: return unit(10.0**exponent).canonise()
-        raise ValueError(f'"{prefix_str}" is not a recognized metric prefix! Supported values are: {[prefixes for (prefixes,_) in lookup_table]}')
+        try:
+            return unit(10.0**_PREFIX_EXPONENTS[prefix_str]).canonise()
+        except KeyError:
+            raise ValueError(f'"{prefix_str}" is not a recognized metric prefix! Supported values are: {[prefixes for (prefixes, _) in _PREFIXES]}') from None
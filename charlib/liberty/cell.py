@@ -5,6 +5,9 @@ from dataclasses import dataclass
 import numpy as np
 import matplotlib.pyplot as plt
 
+from charlib.liberty.util import indent
+
+
 class Cell:
     """A single standard cell"""
     def __init__(self, name: str, area: int=0, **attrs) -> None:
@@ -69,9 +72,10 @@ class Cell:
     def __str__(self) -> str:
         """Return str(self)"""
         lib_str = [f'cell ({self.name}) {{']
-        if 'BUF' in self.name.upper():
+        upper_name = self.name.upper()
+        if 'BUF' in upper_name:
             lib_str.append('  cell_footprint : buf;')
-        elif 'INV' in self.name.upper():
+        elif 'INV' in upper_name:
             lib_str.append('  cell_footprint : inv;')
         lib_str.append(f'  area : {self.area};')
         if self.is_pad_cell():
@@ -79,11 +83,9 @@ class Cell:
         for key, value in self.attributes:
             lib_str.append(f'  {key} : {value};')
         for flop in self.flops:
-            for line in str(flop).split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(str(flop)))
         for pin in dict(sorted(self.pins.items())).values():
-            for line in str(pin).split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(str(pin)))
         lib_str.append('}')
         return '\n'.join(lib_str)
 
@@ -214,8 +216,7 @@ class Pin:
             lib_str.append(f'  three_state : "{self.three_state}";')
         # Internal power
         for data in self.internal_power:
-            for line in str(data).split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(str(data)))
         # min_pulse_width
         if self.role in ['clock', 'set', 'reset']:
             if self.min_pulse_width_high:
@@ -224,8 +225,7 @@ class Pin:
                 lib_str.append(f'  min_pulse_width_low : {self.min_pulse_width_low};')
         # Timing
         for data in self.timings:
-            for line in str(data).split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(str(data)))
         lib_str.append('}')
         return '\n'.join(lib_str)
 
@@ -329,10 +329,8 @@ class InternalPowerData:
         internal_power_str = ['internal_power () {']
         if self.related_pin:
             internal_power_str.append(f'  related_pin : "{self.related_pin}";')
-        for line in str(self.rise_power).split('\n'):
-            internal_power_str.append(f'  {line}')
-        for line in str(self.fall_power).split('\n'):
-            internal_power_str.append(f'  {line}')
+        internal_power_str.append(indent(str(self.rise_power)))
+        internal_power_str.append(indent(str(self.fall_power)))
         internal_power_str.append('}')
         return '\n'.join(internal_power_str)
 
@@ -394,8 +392,7 @@ class TimingData:
         for key, value in self.attributes:
             timing_str.append(f'  {key} : {value};')
         for table in self._tables.values():
-            for line in str(table).split('\n'):
-                timing_str.append(f'  {line}')
+            timing_str.append(indent(str(table)))
         timing_str.append('}')
         return '\n'.join(timing_str)
 
@@ -418,7 +415,7 @@ class Table:
 
         :param name: table name
         :param template: table template
-        :param values: a list of values in the table
+        :param values: a list of numeric values in the table
         :param index_1: indices used to lookup table values in dimension 1
         :param index_2: indices used to lookup table values in dimension 2 (if present)
         """
@@ -473,13 +470,11 @@ class Table:
         ]
         if self.index_2:
             table_str.append(f'  index_2 ("{", ".join(self.index_2)}");')
-        values = self.data().tolist()
+        values = np.reshape([f'{value:7f}' for value in self.values], self.shape).tolist()
         if self.is_2d():
             table_str.append('  values ( \\')
-            rows = ', \\\n'.join([f'"{", ".join(group)}"' for group in values]).split('\n')
-            for row in rows:
-                table_str.append(f'    {row}')
-            table_str[-1] += ');'
+            rows = ', \\\n'.join([f'"{", ".join(group)}"' for group in values])
+            table_str.append(indent(rows, '    ') + ');')
         else:
             table_str.append(f'  values ("{", ".join(values)}");')
         table_str.append('}')
@@ -493,9 +488,7 @@ class Table:
         """Generate a set of axes appropriate for displaying this table's data"""
         to_float = lambda idx: [float(i) for i in idx]
         if self.is_2d():
-            x_index = np.repeat(np.expand_dims(to_float(self.index_1), 1), len(self.index_2), 1)
-            y_index = np.swapaxes(np.repeat(np.expand_dims(to_float(self.index_2), 1), len(self.index_1), 1), 0, 1)
-            indices = [x_index, y_index]
+            indices = np.meshgrid(to_float(self.index_1), to_float(self.index_2), indexing='ij', copy=False)
             ax = figure.add_subplot(projection='3d')
             ax.set_proj_type('ortho')
         else:
@@ -1,9 +1,40 @@
 """Models liberty library groups"""
 
+from charlib.liberty.util import indent
 from charlib.liberty.UnitsSettings import UnitsSettings
 
 # TODO: wire loads, operating conditions, power supplies
 
+# Library-level attributes written at the top of every liberty file
+_HEADER_TEMPLATE = """\
+library ({lib.name}) {{
+  technology : {lib.technology};
+  delay_model : {lib.delay_model};
+  bus_naming_style : "{lib.bus_naming_style}";
+
+  /* Units */
+  time_unit : "1{time_unit}";
+  voltage_unit : "1{voltage_unit}";
+  current_unit : "1{current_unit}";
+  pulling_resistance_unit : "1{resistance_unit}";
+  leakage_power_unit : "1{power_unit}";
+  capacitive_load_unit : "1{capacitance_unit}";
+
+  /* Slew characteristics */
+  slew_upper_threshold_pct_rise : {lib.slew_upper_threshold_pct_rise};
+  slew_lower_threshold_pct_rise : {lib.slew_lower_threshold_pct_rise};
+  slew_upper_threshold_pct_fall : {lib.slew_upper_threshold_pct_fall};
+  slew_lower_threshold_pct_fall : {lib.slew_lower_threshold_pct_fall};
+  input_threshold_pct_rise : {lib.input_threshold_pct_rise};
+  input_threshold_pct_fall : {lib.input_threshold_pct_fall};
+  output_threshold_pct_rise : {lib.output_threshold_pct_rise};
+  output_threshold_pct_fall : {lib.output_threshold_pct_fall};
+
+  /* Operating Conditions */
+  nom_process : {lib.nom_process};
+  nom_voltage : {lib.nom_voltage};
+  nom_temperature : {lib.nom_temperature};"""
+
 class Library:
     """Models a library, which groups cells and their common properties"""
 
@@ -105,45 +136,26 @@ class Library:
     def __str__(self) -> str:
         """Return str(self)"""
         spice_unit = lambda unit : unit.prefixed_unit.str_spice()
-        lib_str = [
-            f'library ({self.name}) {{',
-            f'  technology : {self.technology};',
-            f'  delay_model : {self.delay_model};',
-            f'  bus_naming_style : "{self.bus_naming_style}";',
-            '\n  /* Units */',
-            f'  time_unit : "1{spice_unit(self.units.time)}";',
-            f'  voltage_unit : "1{spice_unit(self.units.voltage)}";',
-            f'  current_unit : "1{spice_unit(self.units.current)}";',
-            f'  pulling_resistance_unit : "1{spice_unit(self.units.resistance)}";',
-            f'  leakage_power_unit : "1{spice_unit(self.units.power)}";',
-            f'  capacitive_load_unit : "1{spice_unit(self.units.capacitance)}";',
-            '\n  /* Slew characteristics */',
-            f'  slew_upper_threshold_pct_rise : {self.slew_upper_threshold_pct_rise};',
-            f'  slew_lower_threshold_pct_rise : {self.slew_lower_threshold_pct_rise};',
-            f'  slew_upper_threshold_pct_fall : {self.slew_upper_threshold_pct_fall};',
-            f'  slew_lower_threshold_pct_fall : {self.slew_lower_threshold_pct_fall};',
-            f'  input_threshold_pct_rise : {self.input_threshold_pct_rise};',
-            f'  input_threshold_pct_fall : {self.input_threshold_pct_fall};',
-            f'  output_threshold_pct_rise : {self.output_threshold_pct_rise};',
-            f'  output_threshold_pct_fall : {self.output_threshold_pct_fall};',
-            '\n  /* Operating Conditions */',
-            f'  nom_process : {self.nom_process};',
-            f'  nom_voltage : {self.nom_voltage};',
-            f'  nom_temperature : {self.nom_temperature};',
-        ]
+        lib_str = [_HEADER_TEMPLATE.format(
+            lib=self,
+            time_unit=spice_unit(self.units.time),
+            voltage_unit=spice_unit(self.units.voltage),
+            current_unit=spice_unit(self.units.current),
+            resistance_unit=spice_unit(self.units.resistance),
+            power_unit=spice_unit(self.units.power),
+            capacitance_unit=spice_unit(self.units.capacitance),
+        )]
         # TODO: Display wire loads, operating conditions, and power supplies
 
         # Display templates from cells
         lib_str.append('\n  /* Table Templates */')
         for template in self.templates():
-            for line in template.split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(template))
 
         # Display cells
         for name, cell in self.cells.items():
             lib_str.append(f'\n  /* {name} */')
-            for line in str(cell).split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(str(cell)))
         
         lib_str.append('}')
         return '\n'.join(lib_str)
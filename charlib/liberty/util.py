@@ -0,0 +1,5 @@
+"""Helpers shared by the liberty writers"""
+
+def indent(text: str, prefix: str='  ') -> str:
+    """Indent every line of a multiline string by prefix"""
+    return prefix + text.replace('\n', '\n' + prefix)